@@ -1,8 +1,11 @@
-import json, zlib
+import functools, heapq, json, struct, sys, zlib
+from collections import Counter
+from itertools import repeat
 
 __all__ = [
     "compactar_lista",
-    "descompactar_lista"
+    "descompactar_lista",
+    "gerar_preset"
 ]
 
 # Códigos de Retorno
@@ -15,236 +18,666 @@ CODES = {
     "ERRO_FORMATO_DADOS": 5      # Erro no formato dos dados do arquivo
 }
 
+# Quantidade de bits consultados de uma vez pela tabela de decodificação
+_BITS_LOOKAHEAD = 8
+_MASCARA_LOOKAHEAD = (1 << _BITS_LOOKAHEAD) - 1
+
+# Tamanho, em bytes, dos blocos em que a entrada é codificada e a saída é escrita
+_TAMANHO_BLOCO = 64 * 1024
+
+# Assinatura e versão gravadas no início do arquivo; arquivos sem elas são de um formato antigo
+_ASSINATURA = b"CPT"
+_VERSAO_FORMATO = 1
+
+# Flags gravadas no cabeçalho do arquivo
+_FLAG_ZLIB = 0x01    # Payload comprimido com zlib em vez do código de Huffman
+_FLAG_PRESET = 0x02  # Código de Huffman vem de um preset e não está gravado no arquivo
+
+# Campos de tamanho fixo do arquivo: cabeçalho (assinatura, versão, flags, tamanho) e inteiros de 32 bits
+_CABECALHO = struct.Struct('<3sBBI')
+_UINT32 = struct.Struct('<I')
+
 # Funções de Acesso
-def compactar_lista(lista_dicionarios, arquivo):
+def compactar_lista(lista_dicionarios, arquivo, *, nivel=None, preset=None):
     """
     Compacta uma lista de dicionários e salva em um arquivo binário já aberto.
 
+    A lista é serializada com json.dumps, de modo que só sobrevivem tipos JSON: chaves
+    int, float, bool ou None são convertidas em str (por exemplo, {1: 'a'} volta como
+    {'1': 'a'}) e tuplas voltam como listas. Valores não serializáveis resultam em
+    ERRO_CODIFICACAO.
+
     Args:
         lista_dicionarios (list of dict): A lista de dicionários a ser compactada.
         arquivo (file-like object): Um objeto de arquivo binário aberto para escrita.
+        nivel (int, optional): Se informado, o payload é comprimido com zlib nesse nível (0 a 9)
+            em vez do código de Huffman. O padrão é usar o código de Huffman.
+        preset (bytes-like, optional): Um preset gerado por gerar_preset. Se informado, o código de
+            Huffman do preset é usado e não é gravado no arquivo; o mesmo preset deve ser
+            passado a descompactar_lista. Não pode ser combinado com nivel.
 
     Returns:
         int: Um inteiro contendo um código de retorno.
     """
     try:
-        lista_string = str(lista_dicionarios)
-        frequencias = _calcular_frequencias(lista_string)
-        arvore_huffman = _construir_arvore_huffman(frequencias)
-        codigo_huffman = _gerar_codigo_huffman(arvore_huffman)
-        texto_codificado = _codificar_lista(lista_string, codigo_huffman)
-        _escrever_binario(texto_codificado, codigo_huffman, arquivo)
+        if nivel is not None and preset is not None:
+            raise ValueError("Os parâmetros nivel e preset não podem ser usados juntos.")
+
+        lista_bytes = json.dumps(lista_dicionarios, ensure_ascii=True).encode('ascii')
+        if nivel is not None:
+            _escrever_zlib(lista_bytes, nivel, arquivo)
+            return CODES["SUCESSO"]
+
+        frequencias = _calcular_frequencias(lista_bytes)
+        if preset is not None:
+            # Normaliza bytearray e memoryview, que não podem ser chaves do cache
+            codigo_huffman = _codigo_dos_comprimentos(bytes(preset))
+            flags = _FLAG_PRESET
+        else:
+            arvore_huffman = _construir_arvore_huffman(frequencias)
+            codigo_huffman = _gerar_codigo_huffman(arvore_huffman)
+            flags = 0
+        blocos_codificados, tamanho = _codificar_lista(lista_bytes, codigo_huffman, frequencias)
+        _escrever_binario(blocos_codificados, tamanho, codigo_huffman, arquivo, flags)
         return CODES["SUCESSO"]
     except (OSError, IOError):
         return CODES["ERRO_ARQUIVO"]
-    except ValueError:
-        return CODES["ERRO_CODIFICACAO"]
-    except Exception:
+    # TypeError: dados não serializáveis em JSON ou preset/nível de tipo inválido;
+    # RecursionError: estruturas aninhadas demais para o json
+    except (ValueError, TypeError, RecursionError):
         return CODES["ERRO_CODIFICACAO"]
 
-def descompactar_lista(arquivo):
+def descompactar_lista(arquivo, *, preset=None):
     """
     Lê um arquivo binário compactado e retorna a lista de dicionários descompactada.
 
     Args:
         arquivo (file-like object): Um objeto de arquivo binário aberto para leitura.
+        preset (bytes-like, optional): O preset usado na compactação, se houver.
 
     Returns:
         tuple: Uma tupla contendo um código de retorno e o retorno em si.
     """
     try:
-        texto_codificado, codigo_huffman = _ler_binario(arquivo)
-        texto_decodificado = _decodificar_texto(texto_codificado, codigo_huffman)
+        flags, tamanho = _ler_cabecalho(arquivo)
+        if flags & _FLAG_ZLIB:
+            texto_decodificado = _ler_zlib(arquivo, tamanho)
+        elif flags & _FLAG_PRESET:
+            if preset is None:
+                raise ValueError("O arquivo foi compactado com um preset, que não foi informado.")
+            dados_codificados, comprimentos = _ler_binario(arquivo, tamanho, bytes(preset))
+            texto_decodificado = _decodificar_texto(dados_codificados, tamanho, comprimentos)
+        else:
+            dados_codificados, comprimentos = _ler_binario(arquivo, tamanho)
+            texto_decodificado = _decodificar_texto(dados_codificados, tamanho, comprimentos)
         lista_decodificada = _texto_para_lista(texto_decodificado)
         return (CODES["SUCESSO"], lista_decodificada)
     except (OSError, IOError) as e:
         return (CODES["ERRO_ARQUIVO"], [])
-    except ValueError as e:
-        return (CODES["ERRO_DECODIFICACAO"], str(e))
-    except Exception as e:
+    # TypeError: preset de tipo inválido; RecursionError: JSON aninhado demais
+    except (ValueError, TypeError, RecursionError) as e:
         return (CODES["ERRO_DECODIFICACAO"], str(e))
 
+def gerar_preset(listas_amostra):
+    """
+    Gera um preset de código de Huffman a partir de listas de dicionários representativas.
+
+    O preset pode ser gravado uma única vez e reutilizado em compactar_lista e
+    descompactar_lista, evitando construir e gravar a tabela em cada arquivo.
+    Todo byte ASCII recebe um código, mesmo que não apareça nas amostras.
+
+    Args:
+        listas_amostra (iterable of list of dict): As listas usadas para estimar as frequências.
+
+    Returns:
+        tuple: Uma tupla contendo um código de retorno e o preset (bytes).
+    """
+    try:
+        frequencias = Counter(range(128))
+        for lista_dicionarios in listas_amostra:
+            frequencias.update(json.dumps(lista_dicionarios, ensure_ascii=True).encode('ascii'))
+        arvore_huffman = _construir_arvore_huffman(frequencias)
+        codigo_huffman = _gerar_codigo_huffman(arvore_huffman)
+        return (CODES["SUCESSO"], _serializar_comprimentos(codigo_huffman))
+    except (ValueError, TypeError, RecursionError) as e:
+        return (CODES["ERRO_CODIFICACAO"], str(e))
+
 
 # Funções Internas (Auxiliares)
 def _calcular_frequencias(representacao_lista):
     """
-    Calcula a frequência de cada caractere na string JSON que representa a lista de dicionários.
+    Calcula a frequência de cada byte no JSON que representa a lista de dicionários.
 
     Args:
-        representacao_lista (str): A string JSON representando a lista de dicionários.
+        representacao_lista (bytes): O JSON, em ASCII, representando a lista de dicionários.
 
     Returns:
-        dict: Um dicionário com a frequência de cada caractere encontrado na string JSON.
+        dict: Um dicionário com a frequência de cada byte encontrado no JSON.
     """
-    frequencias = {}
-    for caractere in representacao_lista:
-        frequencias[caractere] = frequencias.get(caractere, 0) + 1
-    
-    return frequencias
+    return Counter(representacao_lista)
 
 def _construir_arvore_huffman(frequencias):
     """
-    Constrói a árvore de Huffman usando uma lista de prioridade manual.
+    Constrói a árvore de Huffman usando uma fila de prioridade (heapq).
 
     Args:
-        frequencias (dict): Um dicionário com a frequência de cada caractere.
+        frequencias (dict): Um dicionário com a frequência de cada byte.
 
     Returns:
-        list of tuples: A árvore de Huffman representada como uma lista de tuplas (caractere, código).
+        int or tuple: A raiz da árvore de Huffman, em que cada folha é um byte
+        e cada nó interno é uma tupla (filho_esquerdo, filho_direito).
     """
-    heap = [[freq, [simbolo, ""]] for simbolo, freq in frequencias.items()]
-    
+    # O índice desempata frequências iguais sem comparar os nós entre si
+    heap = [(freq, indice, simbolo) for indice, (simbolo, freq) in enumerate(frequencias.items())]
+    heapq.heapify(heap)
+    proximo = len(heap)
+
     while len(heap) > 1:
-        heap.sort()
-        lo = heap.pop(0)
-        hi = heap.pop(0)
-        
-        for par in lo[1:]:
-            par[1] = '0' + par[1]
-        for par in hi[1:]:
-            par[1] = '1' + par[1]
-        
-        heap.append([lo[0] + hi[0]] + lo[1:] + hi[1:])
-    
-    return sorted(heap[0][1:], key=lambda p: (len(p[-1]), p))
+        freq_lo, _, lo = heapq.heappop(heap)
+        freq_hi, _, hi = heapq.heappop(heap)
+        heapq.heappush(heap, (freq_lo + freq_hi, proximo, (lo, hi)))
+        proximo += 1
+
+    return heap[0][2]
 
 def _gerar_codigo_huffman(arvore_huffman):
     """
-    Gera um dicionário de códigos de Huffman a partir da árvore.
+    Gera um dicionário de códigos de Huffman canônicos a partir da árvore.
+
+    A árvore só determina o comprimento do código de cada byte; os códigos
+    em si são atribuídos de forma canônica por _construir_codigo_canonico.
 
     Args:
-        arvore_huffman (list of tuples): A árvore de Huffman representada como uma lista de tuplas (caractere, código).
+        arvore_huffman (int or tuple): A raiz da árvore de Huffman.
 
     Returns:
-        dict: Um dicionário com os códigos de Huffman para cada caractere.
+        dict: Um dicionário com o código (valor, comprimento) de cada byte.
     """
-    return {simbolo: codigo for simbolo, codigo in arvore_huffman}
+    # Uma árvore com um único símbolo ainda precisa de um bit por ocorrência
+    if not isinstance(arvore_huffman, tuple):
+        return _construir_codigo_canonico({arvore_huffman: 1})
+
+    comprimentos = {}
+    pilha = [(arvore_huffman, 0)]
+
+    while pilha:
+        no, profundidade = pilha.pop()
+        if isinstance(no, tuple):
+            pilha.append((no[1], profundidade + 1))
+            pilha.append((no[0], profundidade + 1))
+        else:
+            comprimentos[no] = profundidade
+
+    return _construir_codigo_canonico(comprimentos)
 
-def _codificar_lista(representacao_lista, codigo_huffman):
+def _construir_codigo_canonico(comprimentos):
     """
-    Codifica a string JSON que representa a lista de dicionários utilizando os códigos de Huffman.
+    Constrói o código de Huffman canônico a partir do comprimento de cada código.
+
+    Os bytes são ordenados por (comprimento, byte) e recebem valores
+    consecutivos, deslocados para a esquerda sempre que o comprimento aumenta.
 
     Args:
-        representacao_lista (str): A string JSON representando a lista de dicionários.
-        codigo_huffman (dict): Um dicionário com os códigos de Huffman para cada caractere.
+        comprimentos (dict): Um dicionário com o comprimento do código de cada byte.
 
     Returns:
-        str: O texto codificado resultante da codificação da string JSON.
+        dict: Um dicionário com o código (valor, comprimento) de cada byte.
+    """
+    codigo_huffman = {}
+    valor = 0
+    comprimento_anterior = 0
+
+    for simbolo, comprimento in sorted(comprimentos.items(), key=lambda par: (par[1], par[0])):
+        if not isinstance(comprimento, int) or comprimento < 1:
+            raise ValueError(f"Comprimento de código inválido para '{simbolo}'.")
+        valor <<= comprimento - comprimento_anterior
+        if valor >= 1 << comprimento:
+            raise ValueError("Os comprimentos não formam um código de prefixo válido.")
+        codigo_huffman[simbolo] = (valor, comprimento)
+        valor += 1
+        comprimento_anterior = comprimento
+
+    return codigo_huffman
+
+def _serializar_comprimentos(codigo_huffman):
+    """
+    Serializa o comprimento do código de cada byte em uma tabela densa de 256 bytes.
+
+    Args:
+        codigo_huffman (dict): Um dicionário com o código (valor, comprimento) de cada byte.
+
+    Returns:
+        bytes: O comprimento do código de cada byte, ou 0 para os bytes ausentes.
+    """
+    return bytes(codigo_huffman[byte][1] if byte in codigo_huffman else 0 for byte in range(256))
+
+@functools.lru_cache(maxsize=32)
+def _codigo_dos_comprimentos(comprimentos):
+    """
+    Reconstrói o código de Huffman canônico a partir de uma tabela densa de comprimentos.
+
+    O resultado é mantido em cache, pois o mesmo preset costuma ser usado em vários arquivos.
+    O dicionário retornado é compartilhado e não deve ser modificado.
+
+    Args:
+        comprimentos (bytes): O comprimento do código de cada byte, ou 0 para os bytes ausentes.
+
+    Returns:
+        dict: Um dicionário com o código (valor, comprimento) de cada byte.
+    """
+    if len(comprimentos) != 256:
+        raise ValueError("Erro no formato dos dados do arquivo: tabela de comprimentos inválida.")
+
+    return _construir_codigo_canonico(
+        {byte: comprimento for byte, comprimento in enumerate(comprimentos) if comprimento})
+
+def _codificar_lista(representacao_lista, codigo_huffman, frequencias):
+    """
+    Codifica o JSON que representa a lista de dicionários utilizando os códigos de Huffman.
+
+    Os bits ficam alinhados à esquerda, com o último byte completado com zeros à direita.
+    O empacotamento é preguiçoso: os blocos só são produzidos à medida que são consumidos.
+
+    Args:
+        representacao_lista (bytes): O JSON, em ASCII, representando a lista de dicionários.
+        codigo_huffman (dict): Um dicionário com o código (valor, comprimento) de cada byte.
+        frequencias (dict): Um dicionário com a frequência de cada byte.
+
+    Returns:
+        tuple: Uma tupla contendo um gerador dos blocos codificados (bytes) e a quantidade
+        de bits válidos (int).
+    """
+    try:
+        tamanho = sum(freq * codigo_huffman[simbolo][1] for simbolo, freq in frequencias.items())
+    except KeyError as e:
+        raise ValueError(f"Byte {e.args[0]} não encontrado no código de Huffman.")
+
+    # Tabela plana com o código de cada byte em texto; todo byte presente já foi validado acima
+    tabela = [""] * 256
+    for byte, (valor, comprimento) in codigo_huffman.items():
+        tabela[byte] = format(valor, f"0{comprimento}b")
+    blocos_codificados = _empacotar_bits(representacao_lista, tabela)
+
+    return blocos_codificados, tamanho
+
+def _tabela_pares(tabela):
+    """
+    Monta a tabela com o código concatenado de cada par de bytes.
+
+    Cada par é indexado pelo inteiro de 16 bits que os dois bytes formam na ordem nativa
+    da máquina, que é como memoryview.cast('H') os lê. Só os pares de bytes com código
+    são preenchidos.
+
+    Args:
+        tabela (list of str): O código de cada byte, em texto ("0"/"1"), indexado pelo byte.
+
+    Returns:
+        list of str: O código de cada par de bytes, indexado pelo par.
+    """
+    if sys.byteorder == "little":
+        deslocamento_primeiro, deslocamento_segundo = 0, 8
+    else:
+        deslocamento_primeiro, deslocamento_segundo = 8, 0
+
+    presentes = [byte for byte in range(256) if tabela[byte]]
+    tabela_pares = [""] * 65536
+    for primeiro in presentes:
+        codigo = tabela[primeiro]
+        base = primeiro << deslocamento_primeiro
+        for segundo in presentes:
+            tabela_pares[base | (segundo << deslocamento_segundo)] = codigo + tabela[segundo]
+
+    return tabela_pares
+
+def _empacotar_bits(representacao_lista, tabela):
+    """
+    Empacota os códigos dos bytes da entrada, do bit mais para o menos significativo.
+
+    A entrada é lida dois bytes por vez, e os códigos de cada fatia de _TAMANHO_BLOCO bytes
+    são concatenados com um único join sobre a tabela de pares e convertidos em bytes de
+    uma vez com int(..., 2).to_bytes; os bits que não completam um byte passam para a
+    fatia seguinte. Assim o payload completo nunca fica em memória.
+
+    Args:
+        representacao_lista (bytes): O JSON, em ASCII, representando a lista de dicionários.
+        tabela (list of str): O código de cada byte, em texto ("0"/"1"), indexado pelo byte.
+
+    Yields:
+        bytes: Blocos consecutivos dos bits empacotados.
+    """
+    obter_codigo = _tabela_pares(tabela).__getitem__
+    pares = memoryview(representacao_lista)[:len(representacao_lista) & ~1].cast('H')
+    pares_por_fatia = _TAMANHO_BLOCO // 2
+    resto = ""
+
+    for inicio in range(0, len(pares), pares_por_fatia):
+        bits = resto + "".join(map(obter_codigo, pares[inicio:inicio + pares_por_fatia]))
+        completos = len(bits) // 8
+        if completos:
+            yield int(bits[:completos * 8], 2).to_bytes(completos, 'big')
+        resto = bits[completos * 8:]
+
+    if len(representacao_lista) % 2:
+        resto += tabela[representacao_lista[-1]]
+
+    if resto:
+        # Completa o último byte com zeros à direita
+        restantes = (len(resto) + 7) // 8
+        yield int(resto.ljust(restantes * 8, "0"), 2).to_bytes(restantes, 'big')
+
+def _inverter_codigo_huffman(codigo_huffman):
+    """
+    Inverte o dicionário de códigos de Huffman.
+
+    Args:
+        codigo_huffman (dict): Um dicionário com o código (valor, comprimento) de cada byte.
+
+    Returns:
+        dict: Um dicionário que associa cada tupla (comprimento, valor) ao seu byte.
+    """
+    return {(comprimento, valor): simbolo for simbolo, (valor, comprimento) in codigo_huffman.items()}
+
+def _montar_tabela_decodificacao(codigo_invertido):
     """
-    texto_codificado = ""
-    
-    for caractere in representacao_lista:
-        if caractere in codigo_huffman:
-            texto_codificado += codigo_huffman[caractere]
+    Monta uma tabela de consulta indexada pelos próximos _BITS_LOOKAHEAD bits do fluxo.
+
+    Códigos com até _BITS_LOOKAHEAD bits preenchem todas as entradas que começam por eles.
+    Códigos mais longos são agrupados pelo prefixo e encadeados em tabelas secundárias,
+    sinalizadas por um número de bits negativo na tabela principal.
+
+    Args:
+        codigo_invertido (dict): Um dicionário que associa cada tupla (comprimento, valor) ao seu byte.
+
+    Returns:
+        tuple: Uma tupla (tabela_nbits, tabela_simbolos) com o comprimento e o símbolo de cada entrada.
+    """
+    tabela_nbits = [0] * (1 << _BITS_LOOKAHEAD)
+    tabela_simbolos = [None] * (1 << _BITS_LOOKAHEAD)
+    longos = {}
+
+    for (comprimento, valor), simbolo in codigo_invertido.items():
+        if comprimento <= _BITS_LOOKAHEAD:
+            deslocamento = _BITS_LOOKAHEAD - comprimento
+            inicio = valor << deslocamento
+            fim = inicio + (1 << deslocamento)
+            tabela_nbits[inicio:fim] = [comprimento] * (fim - inicio)
+            tabela_simbolos[inicio:fim] = [simbolo] * (fim - inicio)
         else:
-            raise ValueError(f"Caractere '{caractere}' não encontrado no código de Huffman.")
-    
-    return texto_codificado
+            resto = comprimento - _BITS_LOOKAHEAD
+            prefixo = valor >> resto
+            longos.setdefault(prefixo, {})[(resto, valor & ((1 << resto) - 1))] = simbolo
+
+    for prefixo, codigos_restantes in longos.items():
+        tabela_nbits[prefixo] = -_BITS_LOOKAHEAD
+        tabela_simbolos[prefixo] = _montar_tabela_decodificacao(codigos_restantes)
+
+    return tabela_nbits, tabela_simbolos
+
+@functools.lru_cache(maxsize=32)
+def _tabela_decodificacao(comprimentos):
+    """
+    Constrói a tabela de decodificação correspondente a uma tabela densa de comprimentos.
+
+    O resultado é mantido em cache, de modo que arquivos gravados com o mesmo código
+    (ou com o mesmo preset) reaproveitam a tabela já montada. A tabela retornada é
+    compartilhada e não deve ser modificada.
+
+    Args:
+        comprimentos (bytes): O comprimento do código de cada byte, ou 0 para os bytes ausentes.
+
+    Returns:
+        tuple: A tabela (tabela_nbits, tabela_simbolos) retornada por _montar_tabela_decodificacao.
+    """
+    codigo_huffman = _codigo_dos_comprimentos(comprimentos)
+    return _montar_tabela_decodificacao(_inverter_codigo_huffman(codigo_huffman))
+
+def _decodificar_texto(dados_codificados, tamanho, comprimentos):
+    """
+    Decodifica o fluxo de bits utilizando o código de Huffman.
+
+    A decodificação consulta uma tabela indexada pelos próximos _BITS_LOOKAHEAD bits,
+    obtendo um símbolo inteiro por consulta em vez de avançar bit a bit.
 
-def _decodificar_texto(texto_codificado, codigo_huffman):
+    Args:
+        dados_codificados (bytes): Os bits codificados, empacotados do mais para o menos significativo.
+        tamanho (int): A quantidade de bits válidos em dados_codificados.
+        comprimentos (bytes): O comprimento do código de cada byte, ou 0 para os bytes ausentes.
+
+    Returns:
+        bytes: O texto decodificado.
+    """
+    tabela_raiz = _tabela_decodificacao(comprimentos)
+    return bytes(_desempacotar_bits(dados_codificados, tamanho, tabela_raiz))
+
+def _desempacotar_bits(dados_codificados, tamanho, tabela_raiz):
     """
-    Decodifica o texto codificado utilizando o código de Huffman.
+    Percorre o fluxo de bits consultando a tabela de decodificação.
 
     Args:
-        texto_codificado (str): O texto codificado a ser decodificado.
-        codigo_huffman (dict): Um dicionário com os códigos de Huffman para cada caractere.
+        dados_codificados (bytes): Os bits codificados, empacotados do mais para o menos significativo.
+        tamanho (int): A quantidade de bits válidos em dados_codificados.
+        tabela_raiz (tuple): A tabela (tabela_nbits, tabela_simbolos) retornada por _montar_tabela_decodificacao.
 
     Returns:
-        str: O texto decodificado.
+        list: Os símbolos decodificados, na ordem do fluxo.
     """
-    # Inverte o dicionário de códigos de Huffman para decodificação
-    codigo_invertido = {codigo: simbolo for simbolo, codigo in codigo_huffman.items()}
-    
-    simbolo_atual = ""
-    texto_decodificado = ""
-    
-    for bit in texto_codificado:
-        simbolo_atual += bit
-        
-        # Verifica se o prefixo atual corresponde a um símbolo no código invertido
-        if simbolo_atual in codigo_invertido:
-            texto_decodificado += codigo_invertido[simbolo_atual]
-            simbolo_atual = ""
-    
-    return texto_decodificado
+    tabela_nbits, tabela_simbolos = raiz_nbits, raiz_simbolos = tabela_raiz
+    bits_consulta = _BITS_LOOKAHEAD
+    mascara = _MASCARA_LOOKAHEAD
+
+    simbolos = []
+    adicionar = simbolos.append
+    buffer_bits = 0
+    qtd_bits = 0
+    posicao = 0
+    restantes = tamanho
+
+    while restantes > 0:
+        # Reabastece o buffer com 48 bits de uma vez; além do fim do fluxo completa com zeros
+        if qtd_bits < bits_consulta:
+            novos = dados_codificados[posicao:posicao + 6]
+            if len(novos) < 6:
+                novos = novos.ljust(6, b'\0')
+            buffer_bits = ((buffer_bits & ((1 << qtd_bits) - 1)) << 48) | int.from_bytes(novos, 'big')
+            qtd_bits += 48
+            posicao += 6
+
+        indice = (buffer_bits >> (qtd_bits - bits_consulta)) & mascara
+        comprimento = tabela_nbits[indice]
+
+        if comprimento > 0:
+            adicionar(tabela_simbolos[indice])
+            tabela_nbits, tabela_simbolos = raiz_nbits, raiz_simbolos
+        elif comprimento < 0:
+            tabela_nbits, tabela_simbolos = tabela_simbolos[indice]
+            comprimento = -comprimento
+        else:
+            raise ValueError("Sequência de bits inválida para o código de Huffman.")
+
+        qtd_bits -= comprimento
+        restantes -= comprimento
+
+    if restantes < 0 or tabela_nbits is not raiz_nbits:
+        raise ValueError("Fluxo de bits truncado.")
+
+    return simbolos
 
 def _texto_para_lista(texto):
     """
     Converte o texto decodificado de volta para uma lista de dicionários.
 
     Args:
-        texto (str): O texto decodificado em formato JSON a ser convertido em lista de dicionários.
+        texto (bytes): O texto decodificado em formato JSON a ser convertido em lista de dicionários.
 
     Returns:
         list of dict: A lista de dicionários resultante da conversão do texto.
     """
     try:
-        texto = texto.replace("'",'"')
+        # json.loads aceita os bytes diretamente, sem uma cópia intermediária em str
         lista_dicionarios = json.loads(texto)
         if not isinstance(lista_dicionarios, list):
             raise ValueError("O texto JSON não representa uma lista.")
-        for item in lista_dicionarios:
-            if not isinstance(item, dict):
-                raise ValueError("Os itens na lista JSON não são dicionários.")
+        if not all(map(isinstance, lista_dicionarios, repeat(dict))):
+            raise ValueError("Os itens na lista JSON não são dicionários.")
         return lista_dicionarios
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, UnicodeDecodeError):
         raise ValueError("Erro ao decodificar o texto JSON.")
 
-def _escrever_binario(texto_codificado, codigo_huffman, arquivo):
+def _escrever_binario(blocos_codificados, tamanho, codigo_huffman, arquivo, flags=0):
     """
     Escreve o texto codificado e o código de Huffman manualmente em um arquivo binário já aberto.
 
+    O cabeçalho, o payload e a tabela são acumulados em um buffer e escritos em blocos de
+    pelo menos _TAMANHO_BLOCO bytes; payloads pequenos resultam em uma única escrita.
+
     Args:
-        texto_codificado (str): O texto codificado a ser escrito no arquivo.
-        codigo_huffman (dict): Um dicionário com os códigos de Huffman para cada caractere.
+        blocos_codificados (iterable of bytes): Os blocos codificados a serem escritos no arquivo.
+        tamanho (int): A quantidade de bits válidos nos blocos codificados.
+        codigo_huffman (dict): Um dicionário com o código (valor, comprimento) de cada byte.
         arquivo (file-like object): Um objeto de arquivo binário aberto para escrita.
+        flags (int, optional): As flags do arquivo. Com _FLAG_PRESET, a tabela não é gravada.
 
     Returns:
         None: A função não retorna nada. Os dados são escritos no arquivo.
     """
     try:
-        tamanho = len(texto_codificado)
-        arquivo.write(tamanho.to_bytes(4, 'little')) 
-        
-        valor = int(texto_codificado, 2).to_bytes((tamanho + 7) // 8, 'big')
-        arquivo.write(valor)
-        
-        json_data = json.dumps(codigo_huffman).encode('utf-8')
-        compressed_data = zlib.compress(json_data)
-        
-        arquivo.write(len(compressed_data).to_bytes(4, 'little'))  
-        
-        arquivo.write(compressed_data)
-    except (OSError, IOError) as e:
-        raise RuntimeError(f"Erro ao escrever no arquivo: {e}")
+        saida = bytearray(_CABECALHO.pack(_ASSINATURA, _VERSAO_FORMATO, flags, tamanho))
+
+        for bloco in blocos_codificados:
+            saida += bloco
+            if len(saida) >= _TAMANHO_BLOCO:
+                arquivo.write(saida)
+                saida.clear()
+
+        if not flags & _FLAG_PRESET:
+            # Basta gravar o comprimento do código de cada byte (0 para os ausentes);
+            # o leitor reconstrói o código canônico
+            compressed_data = zlib.compress(_serializar_comprimentos(codigo_huffman))
+            saida += _UINT32.pack(len(compressed_data))
+            saida += compressed_data
 
+        arquivo.write(saida)
+    except struct.error as e:
+        raise ValueError(f"Dados grandes demais para o formato do arquivo: {e}")
 
-def _ler_binario(arquivo):
+
+def _ler_binario(arquivo, tamanho, comprimentos=None):
     """
     Lê o texto codificado e o código de Huffman manualmente de um arquivo binário já aberto.
 
+    O payload e o tamanho da tabela que o segue são lidos em uma única chamada.
+
     Args:
-        arquivo (file-like object): Um objeto de arquivo binário aberto para leitura.
+        arquivo (file-like object): Um objeto de arquivo binário aberto para leitura,
+            posicionado logo após o cabeçalho.
+        tamanho (int): A quantidade de bits válidos no payload, lida do cabeçalho.
+        comprimentos (bytes, optional): A tabela de comprimentos de um preset. Se informada,
+            a tabela não é lida do arquivo.
 
     Returns:
-        tuple: Uma tupla contendo o texto codificado (str) e o dicionário de códigos de Huffman (dict).
+        tuple: Uma tupla contendo os bits codificados (bytes) e o comprimento do código
+        de cada byte (bytes).
     """
     try:
-        tamanho = int.from_bytes(arquivo.read(4), 'little')
-        
         num_bytes = (tamanho + 7) // 8
-        
-        valor = arquivo.read(num_bytes)
-        texto_codificado = bin(int.from_bytes(valor, 'big'))[2:].zfill(tamanho)
-        
-        tamanho_comprimido = int.from_bytes(arquivo.read(4), 'little')
-        
+
+        if comprimentos is not None:
+            dados_codificados = arquivo.read(num_bytes)
+            if len(dados_codificados) != num_bytes:
+                raise ValueError("Erro no formato dos dados do arquivo: payload truncado.")
+            return dados_codificados, comprimentos
+
+        conteudo = arquivo.read(num_bytes + _UINT32.size)
+        dados_codificados = conteudo[:num_bytes]
+        tamanho_comprimido, = _UINT32.unpack_from(conteudo, num_bytes)
+
         conteudo_comprimido = arquivo.read(tamanho_comprimido)
-        json_data = zlib.decompress(conteudo_comprimido).decode('utf-8')
-        codigo_huffman = json.loads(json_data)
-        
-        return texto_codificado, codigo_huffman
-    except (OSError, IOError) as e:
-        raise RuntimeError(f"Erro ao ler o arquivo: {e}")
-    except json.JSONDecodeError as e:
+        # A tabela tem sempre 256 bytes; um a mais já basta para recusá-la sem descomprimir o resto
+        comprimentos = zlib.decompressobj().decompress(conteudo_comprimido, 257)
+        if len(comprimentos) != 256:
+            raise ValueError("Erro no formato dos dados do arquivo: tabela de comprimentos inválida.")
+
+        return dados_codificados, comprimentos
+    except (struct.error, zlib.error) as e:
+        raise ValueError(f"Erro no formato dos dados do arquivo: {e}")
+
+def _escrever_zlib(lista_bytes, nivel, arquivo):
+    """
+    Comprime o JSON com zlib e o escreve em um arquivo binário já aberto.
+
+    Args:
+        lista_bytes (bytes): O JSON, em ASCII, representando a lista de dicionários.
+        nivel (int): O nível de compressão do zlib (0 a 9).
+        arquivo (file-like object): Um objeto de arquivo binário aberto para escrita.
+
+    Returns:
+        None: A função não retorna nada. Os dados são escritos no arquivo.
+    """
+    try:
+        compressed_data = zlib.compress(lista_bytes, nivel)
+        cabecalho = _CABECALHO.pack(_ASSINATURA, _VERSAO_FORMATO, _FLAG_ZLIB, len(compressed_data))
+
+        # Junta cabeçalho e dados em uma única escrita, exceto quando copiar os dados custaria caro
+        if len(compressed_data) < _TAMANHO_BLOCO:
+            arquivo.write(cabecalho + compressed_data)
+        else:
+            arquivo.write(cabecalho)
+            arquivo.write(compressed_data)
+    except struct.error as e:
+        raise ValueError(f"Dados grandes demais para o formato do arquivo: {e}")
+    # OverflowError: nível grande demais para um int de C
+    except (zlib.error, OverflowError) as e:
+        raise ValueError(f"Nível de compressão inválido: {e}")
+
+def _ler_cabecalho(arquivo):
+    """
+    Lê o cabeçalho no início de um arquivo binário já aberto.
+
+    Arquivos que não começam com _ASSINATURA, como os gravados antes dela existir, ou que
+    trazem outra versão do formato, são recusados antes de qualquer decodificação.
+
+    Args:
+        arquivo (file-like object): Um objeto de arquivo binário aberto para leitura.
+
+    Returns:
+        tuple: Uma tupla contendo as flags que indicam o formato do restante do arquivo (int)
+        e o tamanho gravado no cabeçalho (int): a quantidade de bits do payload de Huffman,
+        ou a quantidade de bytes do payload zlib.
+    """
+    cabecalho = arquivo.read(_CABECALHO.size)
+    if not cabecalho:
+        raise ValueError("Erro no formato dos dados do arquivo: arquivo vazio.")
+
+    if not cabecalho.startswith(_ASSINATURA):
+        raise ValueError("Erro no formato dos dados do arquivo: formato antigo ou não suportado.")
+
+    try:
+        _, versao, flags, tamanho = _CABECALHO.unpack(cabecalho)
+    except struct.error as e:
+        raise ValueError(f"Erro no formato dos dados do arquivo: {e}")
+
+    if versao != _VERSAO_FORMATO:
+        raise ValueError(f"Erro no formato dos dados do arquivo: versão {versao} do formato não suportada.")
+
+    # Bits desconhecidos, ou zlib e preset juntos, indicam um formato que não é este
+    if flags & ~(_FLAG_ZLIB | _FLAG_PRESET) or flags == _FLAG_ZLIB | _FLAG_PRESET:
+        raise ValueError(f"Erro no formato dos dados do arquivo: formato desconhecido (flags {flags:#04x}).")
+
+    return flags, tamanho
+
+def _ler_zlib(arquivo, tamanho_comprimido):
+    """
+    Lê e descomprime o JSON gravado com zlib em um arquivo binário já aberto.
+
+    Args:
+        arquivo (file-like object): Um objeto de arquivo binário aberto para leitura,
+            posicionado logo após o cabeçalho.
+        tamanho_comprimido (int): A quantidade de bytes do payload, lida do cabeçalho.
+
+    Returns:
+        bytes: O JSON, em ASCII, representando a lista de dicionários.
+    """
+    try:
+        return zlib.decompress(arquivo.read(tamanho_comprimido))
+    except zlib.error as e:
         raise ValueError(f"Erro no formato dos dados do arquivo: {e}")
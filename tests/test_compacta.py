@@ -0,0 +1,51 @@
+import io
+import unittest
+
+from compacta import compactar_lista, descompactar_lista, gerar_preset
+from compacta.compacta import CODES
+
+LISTA = [
+    {"nome": "Estudar", "prioridade": 1, "feito": False, "tags": ["INF1040", "prova"]},
+    {"nome": "Entregar relatório", "prioridade": 2, "feito": True, "nota": None},
+    {"nome": "it's \"citado\"", "prioridade": 3, "feito": False, "peso": 2.5},
+]
+
+
+def compactar(lista, **kwargs):
+    arquivo = io.BytesIO()
+    codigo = compactar_lista(lista, arquivo, **kwargs)
+    arquivo.seek(0)
+    return codigo, arquivo
+
+
+class TestCompacta(unittest.TestCase):
+    def test_ida_e_volta_padrao(self):
+        for lista in (LISTA, [], [{"a": "x"}], LISTA * 200):
+            codigo, arquivo = compactar(lista)
+            self.assertEqual(codigo, CODES["SUCESSO"])
+            self.assertEqual(descompactar_lista(arquivo), (CODES["SUCESSO"], lista))
+
+    def test_ida_e_volta_zlib(self):
+        for nivel in (0, 6, 9):
+            codigo, arquivo = compactar(LISTA, nivel=nivel)
+            self.assertEqual(codigo, CODES["SUCESSO"])
+            self.assertEqual(descompactar_lista(arquivo), (CODES["SUCESSO"], LISTA))
+
+    def test_ida_e_volta_preset(self):
+        codigo, preset = gerar_preset([LISTA])
+        self.assertEqual(codigo, CODES["SUCESSO"])
+        for preset_usado in (preset, bytearray(preset), memoryview(preset)):
+            codigo, arquivo = compactar(LISTA, preset=preset_usado)
+            self.assertEqual(codigo, CODES["SUCESSO"])
+            self.assertEqual(descompactar_lista(arquivo, preset=preset_usado), (CODES["SUCESSO"], LISTA))
+
+    def test_preset_ausente(self):
+        _, preset = gerar_preset([LISTA])
+        _, arquivo = compactar(LISTA, preset=preset)
+        codigo, mensagem = descompactar_lista(arquivo)
+        self.assertEqual(codigo, CODES["ERRO_DECODIFICACAO"])
+        self.assertIn("preset", mensagem)
+
+
+if __name__ == "__main__":
+    unittest.main()